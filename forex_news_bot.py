@@ -2,16 +2,18 @@
 # A Discord bot that scrapes Forex Factory for economic news.
 
 import os
+import sys
 import discord
-from discord.ext import commands, tasks
+from discord.ext import commands
 import cloudscraper
-from bs4 import BeautifulSoup
+from cachetools import LRUCache, TTLCache
+import orjson
 from datetime import datetime, timedelta
-import pytz
+from zoneinfo import ZoneInfo
+from scraper_core import CALENDAR_FEED_URL, feed_week, parse_events
 import asyncio
-from flask import Flask
-from threading import Thread
-import time # Added for delay
+from aiohttp import web
+from threading import Lock
 
 
 # --- CONFIGURATION ---
@@ -21,9 +23,10 @@ BOT_TOKEN = os.environ.get("DISCORD_TOKEN")
 # Messages
 NO_NEWS_MESSAGE = "No high/medium impact news found for the selected currencies on this day."
 NO_NEWS_ANNOUNCEMENT_MESSAGE = "No high/medium impact news found for today."
+OUT_OF_RANGE_MESSAGE = "That day isn't in this week's Forex Factory calendar yet. Please try again later."
 
 # A set of currencies to ignore for all news.
-EXCLUDED_CURRENCIES = {"AUD", "CAD", "CHF", "CNY", "NZD"}
+EXCLUDED_CURRENCIES = frozenset(sys.intern(c) for c in ("AUD", "CAD", "CHF", "CNY", "NZD"))
 
 # --- ANNOUNCEMENT CONFIGURATION ---
 # The bot will prioritize environment variables on the server for the Channel ID.
@@ -32,8 +35,11 @@ ANNOUNCEMENT_CHANNEL_ID = int(os.environ.get("ANNOUNCEMENT_CHANNEL_ID", 14110000
 ANNOUNCEMENT_TIMEZONE = "Europe/Zurich"
 ANNOUNCEMENT_TIME = "00:00"
 
+# Resolved once at startup instead of on every check.
+_TZ = ZoneInfo(ANNOUNCEMENT_TIMEZONE)
+ANNOUNCEMENT_TIME_OBJ = datetime.strptime(ANNOUNCEMENT_TIME, '%H:%M').time()
+
 last_announcement_date = None # Tracks the date of the last announcement
-bot_has_started = False # Flag to prevent multiple bot instances on Gunicorn
 
 # --- BOT & SCRAPER SETUP ---
 intents = discord.Intents.default()
@@ -50,113 +56,99 @@ scraper.headers.update({
     'Referer': 'https://www.forexfactory.com/calendar'
 })
 
+# Month and weekday names for building the display date without strftime.
+_MONTH_ABBRS = ('Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec')
+_WEEKDAYS = ('Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday')
+
+# The decoded weekly feed is cached for 10 minutes, so every day and command reads the same
+# download instead of re-fetching the rate-limited feed. get_forex_news may run in worker
+# threads, so access to the cache is guarded by a lock.
+_feed_cache = TTLCache(maxsize=1, ttl=600)
+_feed_cache_lock = Lock()
+
 
 # --- WEB SCRAPING LOGIC ---
+def _get_calendar_feed():
+    """Returns the decoded weekly calendar feed, fetching it at most once per cache period."""
+    # The lock is held across the request so concurrent callers share a single download;
+    # the timeout keeps a stalled connection from blocking every other caller on the lock.
+    with _feed_cache_lock:
+        raw_events = _feed_cache.get(CALENDAR_FEED_URL)
+        if raw_events is None:
+            # The feed is a flat JSON array of the week's events, so no HTML parsing is needed.
+            response = scraper.get(CALENDAR_FEED_URL, headers={'Accept': 'application/json'}, timeout=15)
+            response.raise_for_status()
+            raw_events = orjson.loads(response.content)
+            if raw_events:
+                _feed_cache[CALENDAR_FEED_URL] = raw_events
+        return raw_events
+
 def get_forex_news(day_offset=0, timezone_str="UTC"):
     """
-    Scrapes Forex Factory for news for a given day, using a comprehensive, human-like approach.
+    Fetches Forex Factory's weekly calendar feed and returns the news for a given day.
     """
     try:
-        # --- DEFINITIVE FIX: THE "PRIMER" REQUEST ---
-        # First, visit the main calendar page to establish a valid session and get cookies.
-        primer_url = "https://www.forexfactory.com/calendar"
-        primer_response = scraper.get(primer_url)
-        primer_response.raise_for_status() # Ensure the primer request was successful
-
-        # Add a small delay to better mimic human browsing behavior.
-        time.sleep(1)
-
-        # Now that the session is "warmed up", we can request the specific date.
-        tz = pytz.timezone(timezone_str)
+        tz = ZoneInfo(timezone_str)
         now_in_tz = datetime.now(tz)
         
         target_date = now_in_tz + timedelta(days=day_offset)
-        display_date = target_date.strftime("%A, %b %d, %Y")
-        url_date_str = f"{target_date.strftime('%b').lower()}{target_date.day}.{target_date.year}"
-        target_url = f"https://www.forexfactory.com/calendar?day={url_date_str}"
-
-        # Use the now-validated session to get the target page.
-        response = scraper.get(target_url)
-        response.raise_for_status()
-
-        soup = BeautifulSoup(response.content, 'html.parser')
-        news_rows = soup.find_all('tr', class_='calendar__row')
+        display_date = (
+            f"{_WEEKDAYS[target_date.weekday()]}, {_MONTH_ABBRS[target_date.month - 1]} "
+            f"{target_date.day:02d}, {target_date.year}"
+        )
 
-        if not news_rows:
+        raw_events = _get_calendar_feed()
+        if not raw_events:
             return display_date, None
 
-        events = []
-        for row in news_rows:
-            currency_cell = row.find('td', class_='calendar__currency')
-            currency = currency_cell.text.strip() if currency_cell else ""
-
-            if currency in EXCLUDED_CURRENCIES:
-                continue
-
-            impact_cell = row.find('td', class_='calendar__impact')
-            impact_span = impact_cell.find('span') if impact_cell else None
-            
-            impact_class = ""
-            if impact_span and impact_span.has_attr('class'):
-                for cls in impact_span['class']:
-                    if 'calendar__impact-icon--' in cls:
-                        impact_class = cls
-                        break
-            
-            event_cell = row.find('td', class_='calendar__event')
-            event_name = event_cell.text.strip() if event_cell else ""
-
-            is_holiday = "Bank Holiday" in event_name or "holiday" in impact_class
-            is_high_impact = "high" in impact_class
-            is_medium_impact = "medium" in impact_class
-
-            if not (is_holiday or is_high_impact or is_medium_impact):
-                continue
-
-            time_cell = row.find('td', class_='calendar__time')
-            time = time_cell.text.strip() if time_cell else ""
-            
-            forecast_cell = row.find('td', class_='calendar__forecast')
-            forecast = forecast_cell.text.strip() if forecast_cell else ""
-            
-            previous_cell = row.find('td', class_='calendar__previous')
-            previous = previous_cell.text.strip() if previous_cell else ""
-
-            if "Bank Holiday" in event_name:
-                impact_class = "holiday"
-
-            events.append({
-                "time": time or "All Day", "currency": currency, "impact": impact_class,
-                "event": event_name, "forecast": forecast or "N/A", "previous": previous or "N/A",
-            })
-        
+        # The feed only covers the current week, so a day outside it would wrongly look empty.
+        week_start, week_end = feed_week(raw_events, tz)
+        if not week_start <= target_date.date() <= week_end:
+            return "OutOfRange", None
+
+        events = parse_events(raw_events, target_date.date(), tz, EXCLUDED_CURRENCIES)
         return display_date, events if events else None
     except Exception as e:
         # Log the specific error to the console for better debugging
         print(f"An error occurred during scraping: {type(e).__name__} - {e}")
         return "Error", None
 
+_IMPACT_EMOJI = {"high": "🔴", "medium": "🟠", "holiday": "⚪️"}
+
 def format_impact_emoji(impact_class):
-    """Converts impact CSS class to a colored emoji."""
-    if "high" in impact_class: return "🔴"
-    if "medium" in impact_class: return "🟠"
-    if "holiday" in impact_class: return "⚪️"
-    return "⚫️"
+    """Converts an impact tag to a colored emoji."""
+    return _IMPACT_EMOJI.get(impact_class, "⚫️")
 
 # --- DISCORD BOT LOGIC ---
+# Embed payloads keyed by the date and event data they were built from, so identical
+# results (e.g. repeated commands reading the cached feed) skip rebuilding the embed.
+_embed_cache = LRUCache(maxsize=16)
+
 async def send_news_to_channel(channel, day_offset, mention=None):
     """
     A generic function to fetch and send news to a specific channel.
+    Returns False if an announcement was deferred because the day isn't in the feed yet.
     """
     if not isinstance(channel, discord.TextChannel):
         print(f"Error: Invalid channel provided.")
-        return
+        return True
 
-    display_date, news_events = get_forex_news(day_offset, timezone_str=ANNOUNCEMENT_TIMEZONE)
+    # Scraping is blocking, so run it in a worker thread to keep the event loop responsive.
+    display_date, news_events = await asyncio.to_thread(get_forex_news, day_offset, ANNOUNCEMENT_TIMEZONE)
 
     if display_date == "Error":
         await channel.send("Sorry, I couldn't fetch the news. The website might be down or blocking requests.")
-        return
+        return True
+
+    if display_date == "OutOfRange":
+        if mention: # This is an announcement; wait for the feed to roll over instead
+            print("Today isn't in the calendar feed yet, deferring the announcement.")
+            return False
+        try:
+            await channel.send(OUT_OF_RANGE_MESSAGE)
+        except Exception as e:
+            print(f"Failed to send 'out of range' message to channel {channel.name}: {e}")
+        return True
 
     if not news_events:
         try:
@@ -166,22 +158,28 @@ async def send_news_to_channel(channel, day_offset, mention=None):
                 await channel.send(NO_NEWS_MESSAGE)
         except Exception as e:
             print(f"Failed to send 'no news' message to channel {channel.name}: {e}")
-        return
-
-    embed = discord.Embed(
-        title=f"Forex Factory News for {display_date}",
-        color=discord.Color.blue()
-    )
-    embed.set_footer(text="Data sourced from ForexFactory.com")
-
-    for event in news_events:
-        impact_emoji = format_impact_emoji(event['impact'])
-        field_name = f"{event['time']} - {event['currency']} {impact_emoji}"
-        field_value = (
-            f"**Event:** {event['event']}\n"
-            f"**Forecast:** {event['forecast']} | **Previous:** {event['previous']}"
-        )
-        embed.add_field(name=field_name, value=field_value, inline=False)
+        return True
+
+    embed_key = (display_date, tuple(news_events))
+    embed_data = _embed_cache.get(embed_key)
+    if embed_data is None:
+        # Build the embed payload directly rather than calling add_field once per event.
+        fields = [
+            {
+                "name": f"{e.time} - {e.currency} {format_impact_emoji(e.impact)}",
+                "value": f"**Event:** {e.event}\n**Forecast:** {e.forecast} | **Previous:** {e.previous}",
+                "inline": False,
+            }
+            for e in news_events
+        ]
+        embed_data = {
+            "title": f"Forex Factory News for {display_date}",
+            "color": discord.Color.blue().value,
+            "fields": fields,
+            "footer": {"text": "Data sourced from ForexFactory.com"},
+        }
+        _embed_cache[embed_key] = embed_data
+    embed = discord.Embed.from_dict(embed_data)
     
     try:
         if mention:
@@ -190,36 +188,45 @@ async def send_news_to_channel(channel, day_offset, mention=None):
             await channel.send(embed=embed)
     except Exception as e:
         print(f"Failed to send message to channel {channel.name}: {e}")
+    return True
 
 
-@tasks.loop(minutes=1)
 async def daily_news_announcement():
-    """The background task that checks the time and sends the daily news."""
+    """The background task that sleeps until the announcement time and sends the daily news."""
     global last_announcement_date
-    try:
-        tz = pytz.timezone(ANNOUNCEMENT_TIMEZONE)
-        now_in_tz = datetime.now(tz)
-        current_date = now_in_tz.date()
-
-        announcement_time_obj = datetime.strptime(ANNOUNCEMENT_TIME, '%H:%M').time()
-        target_announcement_dt = tz.localize(datetime.combine(current_date, announcement_time_obj))
-
-        if now_in_tz >= target_announcement_dt and current_date != last_announcement_date:
-            channel = bot.get_channel(ANNOUNCEMENT_CHANNEL_ID)
-            if channel:
-                print(f"Sending daily news to channel: {channel.name}")
-                await send_news_to_channel(channel, day_offset=0, mention="@everyone")
-                last_announcement_date = current_date
-            else:
-                print(f"Error: Could not find configured channel with ID {ANNOUNCEMENT_CHANNEL_ID}")
-    except Exception as e:
-        print(f"Error in daily announcement task: {e}")
-
-@daily_news_announcement.before_loop
-async def before_daily_news_announcement():
-    """Wait until the bot is ready before starting the task."""
     await bot.wait_until_ready()
     print("Daily news announcement task is ready.")
+    try:
+        while True:
+            try:
+                now_in_tz = datetime.now(_TZ)
+                current_date = now_in_tz.date()
+
+                if current_date == last_announcement_date:
+                    current_date += timedelta(days=1)
+                target_announcement_dt = datetime.combine(current_date, ANNOUNCEMENT_TIME_OBJ, tzinfo=_TZ)
+
+                if now_in_tz < target_announcement_dt:
+                    # Compare timestamps so the delay stays correct across DST changes.
+                    await asyncio.sleep(target_announcement_dt.timestamp() - now_in_tz.timestamp())
+                    continue
+
+                channel = bot.get_channel(ANNOUNCEMENT_CHANNEL_ID)
+                if channel:
+                    print(f"Sending daily news to channel: {channel.name}")
+                    if await send_news_to_channel(channel, day_offset=0, mention="@everyone"):
+                        last_announcement_date = current_date
+                    else:
+                        # Retry once the cached feed has expired and may have rolled over.
+                        await asyncio.sleep(600)
+                else:
+                    print(f"Error: Could not find configured channel with ID {ANNOUNCEMENT_CHANNEL_ID}")
+                    await asyncio.sleep(60)
+            except Exception as e:
+                print(f"Error in daily announcement task: {e}")
+                await asyncio.sleep(60)
+    except asyncio.CancelledError:
+        print("Daily news announcement task stopped.")
 
 @bot.event
 async def on_ready():
@@ -240,30 +247,35 @@ async def news_tomorrow(ctx):
     await ctx.send(f"Searching for news...")
     await send_news_to_channel(ctx.channel, day_offset=1)
 
+# --- Keep Alive Web Server (For Render Hosting) ---
+async def home(request):
+    return web.Response(text="Bot is alive and running.")
+
+async def start_web_server():
+    """Serves the keep-alive endpoint on the bot's event loop and returns its runner."""
+    app = web.Application()
+    app.router.add_get('/', home)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, '0.0.0.0', 10000)
+    await site.start()
+    return runner
+
 # --- ASYNCHRONOUS STARTUP ---
 async def run_bot_async():
-    """Handles bot startup and background tasks."""
+    """Handles bot startup, the keep-alive web server and background tasks."""
+    runner = await start_web_server()
     async with bot:
-        daily_news_announcement.start()
-        await bot.start(BOT_TOKEN)
-
-# --- Keep Alive Web Server (For Render Hosting) ---
-app = Flask(__name__)
-
-@app.route('/')
-def home():
-    return "Bot is alive and running."
+        announcement_task = asyncio.create_task(daily_news_announcement())
+        try:
+            await bot.start(BOT_TOKEN)
+        finally:
+            announcement_task.cancel()
+            await runner.cleanup()
 
 # --- RUN THE BOT & SERVER ---
 if __name__ == "__main__":
-    # This block is for local development/testing ONLY.
-    # Render will use Gunicorn and will not run this block.
-    
-    # Start the web server in a background thread
-    web_thread = Thread(target=app.run, kwargs={'host':'0.0.0.0','port':10000})
-    web_thread.start()
-    
-    # Start the Discord bot in the main thread
+    # The web server and the Discord bot share a single event loop.
     if BOT_TOKEN:
         try:
             asyncio.run(run_bot_async())
@@ -273,14 +285,3 @@ if __name__ == "__main__":
             print(f"An error occurred while running the bot: {e}")
     else:
         print("ERROR: DISCORD_TOKEN environment variable not found.")
-else:
-    # This block is executed when Gunicorn imports the file to run the web server.
-    # We start the bot in a background thread, ensuring it only starts once.
-    if not bot_has_started:
-        pid = os.getpid()
-        print(f"Starting bot in background thread for Gunicorn. Process ID: {pid}")
-        bot_thread = Thread(target=asyncio.run, args=(run_bot_async(),))
-        bot_thread.daemon = True # Allows Gunicorn to manage the parent process
-        bot_thread.start()
-        bot_has_started = True
-
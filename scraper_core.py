@@ -0,0 +1,86 @@
+# scraper_core.py
+# Pure event-filtering logic for the Forex Factory calendar feed, kept free of discord/asyncio
+# imports and fully annotated so it can be compiled with mypyc:
+#
+#     mypyc scraper_core.py
+#
+# When the compiled extension is present Python imports it in place of this file.
+
+import sys
+from datetime import date, datetime, timedelta, tzinfo
+from typing import Any, NamedTuple
+
+
+# Weekly calendar feed published by Forex Factory.
+CALENDAR_FEED_URL = "https://nfs.faireconomy.media/ff_calendar_thisweek.json"
+
+# Maps the feed's impact labels we report on to a short impact tag.
+IMPACT_MAP: dict[str, str] = {
+    "High": "high",
+    "Medium": "medium",
+    "Holiday": "holiday",
+}
+
+
+class Event(NamedTuple):
+    """A single calendar event, as shown in the news embed."""
+    time: str
+    currency: str
+    impact: str
+    event: str
+    forecast: str
+    previous: str
+
+
+def _format_time(dt: datetime) -> str:
+    """Formats a time the way the calendar page shows it, e.g. '8:30am'."""
+    hour = dt.hour % 12 or 12
+    suffix = "am" if dt.hour < 12 else "pm"
+    return f"{hour}:{dt.minute:02d}{suffix}"
+
+def feed_week(raw_events: list[dict[str, Any]], tz: tzinfo) -> tuple[date, date]:
+    """
+    Returns the first and last day (Sunday to Saturday, in `tz`) of the calendar
+    week covered by the feed's entries.
+    """
+    dates = [datetime.fromisoformat(str(raw['date'])).astimezone(tz).date() for raw in raw_events]
+    first, last = min(dates), max(dates)
+    # date.weekday() is 0 for Monday, while Forex Factory weeks run Sunday to Saturday.
+    return first - timedelta(days=(first.weekday() + 1) % 7), last + timedelta(days=(5 - last.weekday()) % 7)
+
+def parse_events(raw_events: list[dict[str, Any]], target_date: date, tz: tzinfo,
+                 excluded: frozenset[str]) -> list[Event]:
+    """
+    Extracts the high/medium impact and holiday events on `target_date` (in `tz`)
+    from the calendar feed, skipping any whose currency is in `excluded`.
+    """
+    events: list[Event] = []
+    for raw in raw_events:
+        # Interned so repeated codes share one string and the exclusion check is cheap.
+        currency = sys.intern(str(raw.get('country') or ""))
+
+        if currency in excluded:
+            continue
+
+        event_dt = datetime.fromisoformat(str(raw['date'])).astimezone(tz)
+        if event_dt.date() != target_date:
+            continue
+
+        event_name = str(raw.get('title') or "")
+        impact_class = IMPACT_MAP.get(str(raw.get('impact') or ""), "")
+
+        is_holiday = "Bank Holiday" in event_name or impact_class == "holiday"
+        is_high_impact = impact_class == "high"
+        is_medium_impact = impact_class == "medium"
+
+        if not (is_holiday or is_high_impact or is_medium_impact):
+            continue
+
+        if "Bank Holiday" in event_name:
+            impact_class = "holiday"
+
+        events.append(Event(
+            "All Day" if impact_class == "holiday" else _format_time(event_dt), currency, impact_class,
+            event_name, str(raw.get('forecast') or "N/A"), str(raw.get('previous') or "N/A"),
+        ))
+    return events